@@ -12,10 +12,19 @@ Calibrate full parameter set from Unified_Calibration_Full_1931_1954.xlsx.
 """
 
 import os, re, math
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from scipy.optimize import minimize
+from scipy.optimize import minimize, minimize_scalar, Bounds
+from scipy.signal import fftconvolve, lfilter
+from scipy.special import expit
+
+try:  # numba 为可选依赖：缺失时数值内核退回 Cython 预编译版（若已编译）或 numpy 实现
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
 
 # =========================
 # 基本配置
@@ -86,6 +95,29 @@ def load_geo_rules(path):
         print(f"[WARN] 读取 {path} 失败：{e}")
     return rules
 
+# 规则文本中的反向引用写法（保守检测：转义的 \\1 或字符类内的 \1 也算，误判只会退回逐条 search）
+_RE_BACKREF = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+def compile_geo_rules(rules):
+    """
+    把 [(compiled_regex, link), ...] 合并为单个交替正则，一次 match 完成全部规则判断。
+    每条规则前加惰性“任意字符”前缀并以 match 锚定，保证与逐条 search 相同的“按规则顺序优先”；
+    命名组 <LINK>_<序号>，命中后 lastgroup 首段即链路（规则自带的普通捕获组不影响匹配结果）。
+    任一带捕获组的规则含反向引用（\\N、(?P=name)、(?(N)…)）时返回 None：合并后组号整体平移，
+    后续规则里的 \\1 会指向前面规则的外层组而静默失配。合并编译失败同样返回 None。
+    返回 None 时调用方退回逐条 search。
+    """
+    if not rules or any(rx.groups > 0 and _RE_BACKREF.search(rx.pattern) for rx, _ in rules):
+        return None
+    alt = "|".join(f"[\\s\\S]*?(?P<{lk}_{i}>{rx.pattern})" for i, (rx, lk) in enumerate(rules))
+    try:
+        return re.compile(alt, re.IGNORECASE)
+    except re.error:
+        return None
+
+# 层级启发：一次扫描置位 省 / 专区 / 县市 / 乡村 四个标志
+_HIER_RX = re.compile(r"(省)|(专区|专署|地区|行政督察区)|(县|市|市辖区)|(乡|鎭|镇|村|公社|大队|生产队)")
+
 # =========================
 # 兜底分类配置（保证可跑通）
 # =========================
@@ -99,6 +131,8 @@ PAIR_SCALE = 1.0                  # 合成方向的缩放（1.0=同量；也可
 
 # 每条链路的 τ 先验（天）：ZP 省↔专区、PC 专区↔县/市、CV 县/市↔乡/村
 TAU_PRIOR_PER_LINK = {"ZP": 10, "PC": 7, "CV": 3}
+# τ 的 Poisson 细化只在互相关初值附近 ±该天数内搜索（似然随核宽变化而多峰）
+TAU_REFINE_HALFWIDTH = 5.0
 
 # 未能判定链路时的分配概率（需归一化）
 FALLBACK_LINK_PROBS = {"ZP": 0.33, "PC": 0.34, "CV": 0.33}
@@ -110,12 +144,31 @@ FALLBACK_DIR_PROBS  = {"SHIP": 0.50, "ARR": 0.50}
 FALLBACK_SPLIT_ENDPOINTS = True
 
 _rng_fb = np.random.default_rng(FALLBACK_SEED)
-def _choose_by_probs(prob_map):
-    keys = list(prob_map.keys())
-    ps   = np.array([float(prob_map[k]) for k in keys], dtype=float)
-    ps   = ps / ps.sum()
-    idx = _rng_fb.choice(len(keys), p=ps)
-    return keys[idx]
+
+# 兜底概率在加载时归一化一次；抽样改为整批预抽（每次 choice 调用开销远大于查表）
+def _freeze(pm):
+    keys = list(pm)
+    p = np.array([pm[k] for k in keys], dtype=float)
+    p /= p.sum()
+    return keys, p
+
+_LINK_KEYS, _LINK_P = _freeze(FALLBACK_LINK_PROBS)
+_DIR_KEYS,  _DIR_P  = _freeze(FALLBACK_DIR_PROBS)
+
+# (link, dir) 整数编码：热循环与后处理只传递小整数，"LINK_<link>_<dir>" 名称在写出时查表
+LINK_CODE = {"ZP": 0, "PC": 1, "CV": 2, "UNK": 3}
+DIR_CODE  = {"SHIP": 0, "ARR": 1, "UNK": 2}
+NAME_TABLE = {(l, d): f"LINK_{lk}_{dr}" for lk, l in LINK_CODE.items() for dr, d in DIR_CODE.items()}
+_LINK_KEY_CODES = np.array([LINK_CODE[k] for k in _LINK_KEYS])
+_DIR_KEY_CODES  = np.array([DIR_CODE[k] for k in _DIR_KEYS])
+
+def _choose_link(size):
+    """按兜底概率整批抽取 size 个链路编码。"""
+    return _LINK_KEY_CODES[_rng_fb.choice(len(_LINK_KEYS), size=size, p=_LINK_P)]
+
+def _choose_dir(size):
+    """按兜底概率整批抽取 size 个方向编码。"""
+    return _DIR_KEY_CODES[_rng_fb.choice(len(_DIR_KEYS), size=size, p=_DIR_P)]
 
 # =========================
 # 中文数字与民国纪年支持
@@ -126,9 +179,30 @@ CN_DIGIT = {
 }
 DECADE_REP = { "上旬": 5, "中旬": 15, "下旬": 25 }
 
+# 预编译正则（模块加载时编译一次，逐行解析时直接复用）
+_RE_YEAR          = re.compile(r"(19\d{2}|20\d{2})年")
+_RE_MINGUO_Y_CN   = re.compile(r"民国([〇零一二两三四五六七八九十廿卅]+)年")
+_RE_MINGUO_Y_AR   = re.compile(r"民国(\d{1,3})年")
+_RE_RANGE         = re.compile(r"([一二三四五六七八九十廿卅\d]{1,3})月([一二三四五六七八九十廿卅初\d]{1,3})?日?"
+                               r"(?:\s*-\s*|到|-|—)"
+                               r"([一二三四五六七八九十廿卅\d]{1,3})月([一二三四五六七八九十廿卅初\d]{1,3})?日?")
+_RE_MD_ARAB       = re.compile(r"(?P<m>\d{1,2})[-\.月](?P<d>\d{1,2})日?")
+_RE_MD_CN         = re.compile(r"([一二三四五六七八九十廿卅]{1,3})月([一二三四五六七八九十廿卅初]{1,3})日")
+_RE_YMD           = re.compile(r"(?P<y>19\d{2}|20\d{2})年(?P<m>\d{1,2})月(?P<dec>上旬|中旬|下旬)?")
+_RE_MINGUO_YM_DEC = re.compile(r"民国([〇零一二两三四五六七八九十廿卅]+)年([一二三四五六七八九十廿卅]{1,3})月(上旬|中旬|下旬)?")
+_RE_M_DEC         = re.compile(r"([一二三四五六七八九十廿卅]{1,3})月(上旬|中旬|下旬)")
+_RE_MM_PAIR       = re.compile(r"([一二三四五六七八九十廿卅])、([一二三四五六七八九十廿卅])月")
+
+# 日期线索预筛：上述各式都需要“月”，或数字间的 -/. 类分隔（含归一化前的中文/全角写法）；
+# 不含线索的文本不可能解析出日期，可跳过整套正则
+_HAS_DATE_HINT    = re.compile(r"月|\d[-./．。—－~至]\d")
+
+# 全角→半角转换表（加载时构建一次）
+_HW_TBL = str.maketrans("１２３４５６７８９０．／－～：",
+                        "1234567890./-~:")
+
 def _to_halfwidth(s: str) -> str:
-    return s.translate(str.maketrans("１２３４５６７８９０．／－～：",
-                                     "1234567890./-~:"))
+    return s.translate(_HW_TBL)
 
 def _cn_str_to_int(s: str) -> int:
     if not s: return None
@@ -153,11 +227,11 @@ def _cn_str_to_int(s: str) -> int:
     return total if total>0 else None
 
 def _parse_minguo_year(s: str):
-    m = re.search(r"民国([〇零一二两三四五六七八九十廿卅]+)年", s)
+    m = _RE_MINGUO_Y_CN.search(s)
     if m:
         y = _cn_str_to_int(m.group(1))
         return 1911 + y if y else None
-    m = re.search(r"民国(\d{1,3})年", s)
+    m = _RE_MINGUO_Y_AR.search(s)
     if m:
         y = int(m.group(1))
         return 1911 + y if y else None
@@ -182,34 +256,99 @@ def _safe_date(y, m, d):
     except Exception:
         return None
 
-def parse_dates_from_text(text, default_year=None):
+# 快速通道分隔符：第一个分隔符 -> 要求的第二个分隔符
+_FAST_SEP = {"-": "-", ".": ".", "年": "月"}
+
+def _fast_iso_date(s: str, default_year=None):
+    """
+    快速通道：整串恰为 YYYY-MM-DD / YYYY.MM.DD / YYYY年M月D日 时，单次扫描直接给出
+    与完整解析流程相同的结果，不走正则；其它情况返回 None，交给完整流程。
+      - YYYY年M月D日：年份取 default_year（缺省为文本年份，须 19xx/20xx），
+        另含 年-月 一趟给出的文本年份当月 15 日
+      - YYYY-MM-DD / YYYY.MM.DD：无 default_year 时完整流程定不出年份，结果为 []；
+        有 default_year 时交回完整流程
+    """
+    n = len(s)
+    if n < 8 or n > 11:
+        return None
+    for i in range(4):
+        if not ("0" <= s[i] <= "9"):
+            return None
+    sep2 = _FAST_SEP.get(s[4])
+    if sep2 is None:
+        return None
+    # 月
+    i = j = 5
+    while j < n and j - i < 2 and "0" <= s[j] <= "9":
+        j += 1
+    if j == i or j >= n or s[j] != sep2:
+        return None
+    mm = int(s[i:j])
+    # 日
+    i = j = j + 1
+    while j < n and j - i < 2 and "0" <= s[j] <= "9":
+        j += 1
+    if j == i:
+        return None
+    dd = int(s[i:j])
+    if sep2 == "月" and j < n and s[j] == "日":
+        j += 1
+    if j != n:
+        return None
+    if sep2 != "月":
+        return None if default_year else []
+    y = int(s[:4])
+    text_year = y if s[:2] in ("19", "20") else None
+    year = default_year or text_year
+    out = []
+    if year and 1 <= mm <= 12 and 1 <= dd <= 31:
+        out.append(_safe_date(year, mm, dd))
+    if text_year and 1 <= mm <= 12:
+        out.append(_safe_date(y, mm, 15))
+    return _sorted_unique(out)
+
+def _sorted_unique(out):
+    # 排序后去掉相邻重复（候选通常只有几个，免去 set 构造与二次转换）
+    out = [d for d in out if d]
+    out.sort()
+    if len(out) > 1:
+        out = [out[0]] + [b for a, b in zip(out, out[1:]) if a != b]
+    return out
+
+def parse_dates_from_text(text, default_year=None, already_halfwidth=False):
     """
     解析中文/民国日期与区间：
       - 1931年7月25日 / 1954年8月
       - 民国二十年七月廿五日 / 七月初十 / 八月下旬 / 七、八月
       - 区间：7月25日至8月5日 / 七月下旬至八月上旬
+    already_halfwidth=True 表示调用方已做过全角→半角转换，跳过内部 translate。
     返回：list[date]（端点模式≤2；uniform模式可能为区间内多日）
     """
     if not isinstance(text, str) or not text.strip():
         return []
-    s = _to_halfwidth(text)
+    s = text if already_halfwidth else _to_halfwidth(text)
     s = s.replace("．",".").replace("。",".").replace("/", "-")
     s = s.replace("—","-").replace("－","-").replace("~","-").replace("至","-")
     s = s.replace("　"," ").strip()
 
-    year = _parse_minguo_year(s) or default_year
+    fast = _fast_iso_date(s, default_year)
+    if fast is not None:
+        return fast
+
+    # 各趟正则按其必需的字面量（民国/年/月/日/旬/、）与年份门控，缺失即整趟跳过
+    has_minguo = "民国" in s
+    has_month  = "月" in s
+    year = (_parse_minguo_year(s) if has_minguo else None) or default_year
     if not year:
-        m = re.search(r"(19\d{2}|20\d{2})年", s)
+        m = _RE_YEAR.search(s)
         if m:
             year = int(m.group(1))
 
     out = []
 
     # 区间（两端）
-    rng = re.search(r"([一二三四五六七八九十廿卅\d]{1,3})月([一二三四五六七八九十廿卅初\d]{1,3})?日?"
-                    r"(?:\s*-\s*|到|-|—)"
-                    r"([一二三四五六七八九十廿卅\d]{1,3})月([一二三四五六七八九十廿卅初\d]{1,3})?日?", s)
-    if rng and year:
+    rng = _RE_RANGE.search(s) if (year and has_month) else None
+    if rng:
         m1 = _cn_month_to_int(rng.group(1))
         d1_tok = rng.group(2) or "15"
         d1 = _cn_str_to_int(d1_tok) or (DECADE_REP.get(d1_tok, 15) if d1_tok in DECADE_REP else 15)
@@ -229,96 +368,159 @@ def parse_dates_from_text(text, default_year=None):
                 out.extend([dA, dB])
 
     # 具体“月-日”：阿拉伯 / 中文
-    for m in re.finditer(r"(?P<m>\d{1,2})[-\.月](?P<d>\d{1,2})日?", s):
-        if year:
+    if year:
+        for m in _RE_MD_ARAB.finditer(s):
             mm = int(m.group("m")); dd = int(m.group("d"))
             if 1<=mm<=12 and 1<=dd<=31:
                 d = _safe_date(year, mm, dd)
                 if d: out.append(d)
-    for m in re.finditer(r"([一二三四五六七八九十廿卅]{1,3})月([一二三四五六七八九十廿卅初]{1,3})日", s):
-        if year:
+    if year and has_month and "日" in s:
+        for m in _RE_MD_CN.finditer(s):
             mm = _cn_month_to_int(m.group(1)+"月")
             dd = _cn_str_to_int(m.group(2))
             if mm and dd and 1<=dd<=31:
                 d = _safe_date(year, mm, dd)
                 if d: out.append(d)
 
+    if not has_month:
+        return _sorted_unique(out)
+
     # 年-月 / 旬
-    for m in re.finditer(r"(?P<y>19\d{2}|20\d{2})年(?P<m>\d{1,2})月(?P<dec>上旬|中旬|下旬)?", s):
+    for m in (_RE_YMD.finditer(s) if "年" in s else ()):
         y = int(m.group("y")); mm = int(m.group("m")); dec = m.group("dec")
         if 1<=mm<=12:
             day = DECADE_REP[dec] if dec else 15
             d = _safe_date(y, mm, day);  out.append(d) if d else None
-    for m in re.finditer(r"民国([〇零一二两三四五六七八九十廿卅]+)年([一二三四五六七八九十廿卅]{1,3})月(上旬|中旬|下旬)?", s):
+    for m in (_RE_MINGUO_YM_DEC.finditer(s) if has_minguo else ()):
         gy = _parse_minguo_year(m.group(0))
         mm = _cn_month_to_int(m.group(2)+"月")
         dec = m.group(3)
         if gy and mm:
             day = DECADE_REP[dec] if dec else 15
             d = _safe_date(gy, mm, day); out.append(d) if d else None
-    for m in re.finditer(r"([一二三四五六七八九十廿卅]{1,3})月(上旬|中旬|下旬)", s):
-        if year:
+    if year and "旬" in s:
+        for m in _RE_M_DEC.finditer(s):
             mm = _cn_month_to_int(m.group(1)+"月")
             if mm:
                 d = _safe_date(year, mm, DECADE_REP[m.group(2)]); out.append(d) if d else None
-    for m in re.finditer(r"([一二三四五六七八九十廿卅])、([一二三四五六七八九十廿卅])月", s):
-        if year:
-            mm1 = _cn_month_to_int(m.group(1)+"月"); mm2 = _cn_month_to_int(m.group(2)+"月")
+    if year and "、" in s:
+        for a, b in _RE_MM_PAIR.findall(s):
+            mm1 = _cn_month_to_int(a+"月"); mm2 = _cn_month_to_int(b+"月")
             if mm1: out.append(_safe_date(year, mm1, 15))
             if mm2: out.append(_safe_date(year, mm2, 15))
 
-    out = sorted(list({d for d in out if d}))
-    return out
+    return _sorted_unique(out)
 
 # =========================
 # 数量抽取（增强）
 # =========================
-def parse_quantities_from_text(text):
+# 倍率词可选：一次扫描同时覆盖“3万斤”与“500斤”（“5千克”中 千 无后续单位时回溯为单位“千克”）
+_RE_QTY        = re.compile(r"(?P<num>[\d,\.]+)\s*(?P<mult>万|千|百)?\s*(?P<unit>吨|t|kg|千克|公斤|斤|石|担|斗|升|袋|车)")
+# 数量线索预筛：文本中至少出现某个单位的首字
+_HAS_QTY_HINT  = re.compile("[" + "".join(sorted({u[0] for u in UNIT_TO_KG})) + "]")
+
+def parse_quantities_from_text(text, already_halfwidth=False):
     """
     抽取所有数量+单位并合并：
       - 支持“万/千/百”倍率词（如“3万斤”“2千袋”“3.5万石”）
       - 支持任意多处匹配，合并求和
+    already_halfwidth=True 表示调用方已做过全角→半角转换。
     返回：value_in_kg（float）；若无数量则返回 None
     """
     if not isinstance(text, str) or not text.strip():
         return None
-    s = _to_halfwidth(text)
+    s = text if already_halfwidth else _to_halfwidth(text)
+    if not _HAS_QTY_HINT.search(s):
+        return None
     total_kg = 0.0
     found = False
 
-    pat_mul = r"(?P<num>[\d,\.]+)\s*(?P<mult>万|千|百)\s*(?P<unit>吨|t|kg|千克|公斤|斤|石|担|斗|升|袋|车)"
-    for m in re.finditer(pat_mul, s):
-        num = float(m.group("num").replace(",",""))
-        mult = MULTIPLIER.get(m.group("mult"), 1.0)
-        unit = m.group("unit")
-        kg = num * mult * UNIT_TO_KG.get(unit, np.nan)
-        if not math.isnan(kg):
-            total_kg += kg; found = True
-
-    pat_simple = r"(?P<num>[\d,\.]+)\s*(?P<unit>吨|t|kg|千克|公斤|斤|石|担|斗|升|袋|车)"
-    for m in re.finditer(pat_simple, s):
-        num = float(m.group("num").replace(",",""))
-        unit = m.group("unit")
-        kg = num * UNIT_TO_KG.get(unit, np.nan)
-        if not math.isnan(kg):
-            total_kg += kg; found = True
+    # 正则中的单位/倍率候选均为表内键，直接下标取值，无需 NaN 哨兵
+    for num, mult, unit in _RE_QTY.findall(s):
+        total_kg += float(num.replace(",","")) * (MULTIPLIER[mult] if mult else 1.0) * UNIT_TO_KG[unit]
+        found = True
 
     return float(total_kg) if found else None
 
 # =========================
 # 通用工具
 # =========================
-def resample_series(dates, values, freq="D", week_rule="W-MON"):
-    ser = pd.Series(values, index=pd.to_datetime(dates))
-    if freq == "D":
-        ser = ser.resample("D").sum().fillna(0.0)
-    else:
-        ser = ser.resample(week_rule).sum().fillna(0.0)
-    return ser
-
-def poisson_nll(y, mu):
-    mu = np.clip(mu, 1e-10, None)
-    return np.sum(mu - y * np.log(mu))
+# Poisson 负对数似然（省去与参数无关的 log y! 项）；numba 版 mu − y·log mu 单遍融合，nogil 释放 GIL。
+# 不用 parallel=True/prange：estimate_taus 按链路在线程池中并发调用本内核，而 numba 默认的
+# workqueue 线程层被多个 Python 线程同时进入并行区时会死锁；T≈8.5k 的单遍规约也无需再拆核
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=True, nogil=True)
+    def poisson_nll(y, mu):
+        s = 0.0
+        for i in range(y.size):
+            m = mu[i] if mu[i] > 1e-10 else 1e-10
+            s += m - y[i] * math.log(m)
+        return s
+else:
+    def poisson_nll(y, mu):
+        mu = np.clip(mu, 1e-10, None)
+        return np.sum(mu - y * np.log(mu))
+
+# hazard 目标：z = [ξ_1..ξ_T, log α_breach, log α_media]，h = softplus(ξ) > 0 无需边界与截断；
+# 两通道 Poisson + 一阶差分平滑。两通道共用 h，NLL 合并为
+#   (α1+α2)·Σh − Σ(y1+y2)·log h − log α1·Σy1 − log α2·Σy2
+# ys = y1+y2 与 sy1 = Σy1、sy2 = Σy2 由调用方在优化前算好，每次求值只遍历 h 一次。
+# 返回 (目标值, 解析梯度)，供 minimize(jac=True) 使用：
+#   ∂/∂h_t = α1+α2 − ys_t/h_t + 2λ(d_t − d_{t+1})，d_t = h_t − h_{t−1}；∂h/∂ξ = sigmoid(ξ)
+#   ∂/∂log α1 = α1·Σh − Σy1，∂/∂log α2 = α2·Σh − Σy2
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def _softplus(x):
+        return max(x, 0.0) + math.log1p(math.exp(-abs(x)))
+
+    @njit(cache=True, fastmath=True)
+    def hazard_nll(z, ys, sy1, sy2, lam):
+        T = ys.size
+        a1 = math.exp(z[T]); a2 = math.exp(z[T+1])
+        g = np.zeros(T + 2)
+        h = np.empty(T)
+        sh = 0.0; slog = 0.0; pen = 0.0
+        for t in range(T):
+            h[t] = _softplus(z[t])
+            sh += h[t]
+            # log 项只在观测非零处计算（序列多为稀疏事件）
+            g[t] = a1 + a2
+            if ys[t] != 0.0:
+                ht = max(h[t], 1e-300)
+                slog += ys[t] * math.log(ht)
+                g[t] -= ys[t] / ht
+            if t > 0:
+                d = h[t] - h[t-1]
+                pen += d * d
+                g[t] += 2.0 * lam * d
+                g[t-1] -= 2.0 * lam * d
+        for t in range(T):
+            # sigmoid(ξ) = 1 − exp(−softplus(ξ))
+            g[t] *= -math.expm1(-h[t])
+        g[T] = a1 * sh - sy1
+        g[T+1] = a2 * sh - sy2
+        return (a1 + a2) * sh - slog - z[T] * sy1 - z[T+1] * sy2 + lam * pen, g
+else:
+    def hazard_nll(z, ys, sy1, sy2, lam):
+        T = ys.size
+        xi = z[:T]
+        h = np.logaddexp(0.0, xi)
+        a1 = math.exp(z[T+0]); a2 = math.exp(z[T+1])
+        hc = np.maximum(h, 1e-300)
+        dh = h[1:] - h[:-1]
+        sh = h.sum()
+        f = (a1 + a2) * sh - ys @ np.log(hc) - z[T]*sy1 - z[T+1]*sy2 + lam * (dh @ dh)
+        gh = (a1 + a2) - ys / hc
+        gh[1:] += 2.0 * lam * dh
+        gh[:-1] -= 2.0 * lam * dh
+        return f, np.r_[gh * expit(xi), a1*sh - sy1, a2*sh - sy2]
+
+# numba 缺失时优先使用预编译的 Cython 内核（_sd_relief_kernels.pyx，需先 cythonize）
+if not HAS_NUMBA:
+    try:
+        from _sd_relief_kernels import poisson_nll, hazard_nll
+    except ImportError:
+        pass
 
 # =========================
 # 读取工作簿
@@ -326,6 +528,44 @@ def poisson_nll(y, mu):
 def load_workbook(path):
     return pd.read_excel(path, sheet_name=None)
 
+# =========================
+# 分类关键词（单次多模式扫描）
+# =========================
+SHIP_KW  = ["发运","起运","启运","发出","运出","装船","装车","开航","发往","发去","发至","起运于","出发"]
+ARR_KW   = ["到达","抵达","运到","运至","送达","收到","收讫","到库","入库","验收入库","收储","接收","交付"]
+MEDIA_KW = ["媒体","报刊","电台","广播","专电","通电","呈文","报告","批复","指示","指令","请求","请拨","请赈","致函","启事","公告"]
+STOCK_KW = ["库存","仓","仓库","在库","在途","存粮","存料","转仓","出入库","清查","盘点"]
+ALLOC_KW = ["拨付","拨款","划拨","下拨","经费","款项","募捐","募集","捐助","赈济款","赈款","拨交","拨给","拨至"]
+VDIST_KW = ["发放","分发","赈济","救济","救发","配给","配售","按户发放","按人发放","按口粮","按人口","下发","发至各村"]
+
+KW_GROUPS = {
+    "SHIP": SHIP_KW, "ARR": ARR_KW, "MEDIA": MEDIA_KW, "STOCK": STOCK_KW,
+    "ALLOC": ALLOC_KW, "VDIST": VDIST_KW,
+    "TRANSPORT": ["运"],            # “运输”/“运”
+    "BREACH": ["溃堤","决口"],
+}
+
+def _build_kw_scanner(groups):
+    """
+    把全部关键词合并成一个零宽前瞻交替式（长词优先），逐位置只取最长命中；
+    每个关键词的标签 = 所有是其前缀的关键词所属类别之并。
+    这样一次扫描得到的类别集合与逐词 `k in text` 完全一致。
+    """
+    words = {w.lower() for ws in groups.values() for w in ws}
+    tags = {w: frozenset(cat for cat, ws in groups.items() for k in ws if w.startswith(k.lower()))
+            for w in words}
+    alt = "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+    return re.compile(f"(?=({alt}))"), tags
+
+_RE_KW, _KW_TAGS = _build_kw_scanner(KW_GROUPS)
+
+def _kw_categories(text_low):
+    """一次扫描返回文本命中的关键词类别集合（text 需已小写）。"""
+    cats = set()
+    for m in _RE_KW.finditer(text_low):
+        cats |= _KW_TAGS[m.group(1)]
+    return cats
+
 # =========================
 # 从证据构建时序（核心）
 # =========================
@@ -346,128 +586,144 @@ def build_series_from_evidence(sheets, freq="D", week_rule="W-MON"):
 
     # 加载地名规则
     geo_rules = load_geo_rules(GEO_LINK_MAP_CSV)
-
-    rows_split = []
+    geo_rx = compile_geo_rules(geo_rules)
+
+    # —— 逐列预计算（无状态步骤向量化）：文本拼接、年份、关键词类别
+    note_s = evi["notes"].fillna("").astype(str)
+    ctx_s  = evi["quote_excerpt"].fillna("").astype(str)
+    note_hw_s = note_s.str.translate(_HW_TBL)
+    ctx_hw_s  = ctx_s.str.translate(_HW_TBL)
+    year_s = pd.to_numeric((note_hw_s + " " + ctx_hw_s).str.extract(_RE_YEAR, expand=False),
+                           errors="coerce").fillna(0).astype(int)
+    merged_low_s = (ctx_s + " " + note_s).str.lower()
+    cats_s       = merged_low_s.map(_kw_categories)
+
+    # 行循环只做数组下标访问：原始字段逐元素 str()（NaN → "nan"，不依赖 astype(str) 在各 pandas 版本的差异）
+    # 一次转为对象数组，预计算列同样取出底层数组
+    cols = {c: evi[c].map(str).to_numpy() for c in ["mapped_ts_id","period","mapped_param_id","snippet_or_key"]}
+    note_a, ctx_a       = note_s.to_numpy(), ctx_s.to_numpy()
+    note_hw_a, ctx_hw_a = note_hw_s.to_numpy(), ctx_hw_s.to_numpy()
+    merged_low_a = merged_low_s.to_numpy()
+    year_a = year_s.to_numpy()
+    cats_a = cats_s.to_numpy()
+
+    # 兜底随机：按行整批预抽链路/方向候选，行内按需取用
+    link_draws = _choose_link(len(evi))
+    dir_draws  = _choose_dir(len(evi))
+
+    # 明细记录按列存放（ts_id / date / value 三个平行列表），避免逐行 dict；
+    # LINK 记录另带 link/dir 整数编码（非 LINK 记为 -1）
+    ts_ids, dates, values = [], [], []
+    link_codes, dir_codes = [], []
     extract_logs = []
 
-    for idx, r in evi.iterrows():
-        ts_id = str(r.get("mapped_ts_id","")).strip()
+    # 链路推断：优先地名规则；显式 ZP/PC/CV；层级启发；最后 UNK
+    # text_low 为已小写的合并文本（规则均大小写不敏感），避免逐行再做 upper() 拷贝
+    def decide_link(ts_id, text_low):
+        if geo_rx is not None:
+            m = geo_rx.match(text_low)
+            if m:
+                return m.lastgroup.split("_")[0]
+        else:
+            for rx, lk in geo_rules:
+                if rx.search(text_low):
+                    return lk
+        u = (ts_id or "").upper()
+        if "ZP" in u: return "ZP"
+        if "PC" in u: return "PC"
+        if "CV" in u: return "CV"
+        if "zp" in text_low: return "ZP"
+        if "pc" in text_low: return "PC"
+        if "cv" in text_low: return "CV"
+        hier = [False, False, False, False]
+        for m in _HIER_RX.finditer(text_low):
+            hier[m.lastindex - 1] = True
+            if all(hier):
+                break
+        has_sheng, has_zhuanqu, has_xian, has_xiangcun = hier
+        if has_sheng and has_zhuanqu and not has_xian:
+            return "ZP"
+        if has_zhuanqu and has_xian and not has_xiangcun:
+            return "PC"
+        if has_xian and has_xiangcun:
+            return "CV"
+        return "UNK"
+
+    for i, idx in enumerate(evi.index):
+        ts_id = cols["mapped_ts_id"][i].strip()
         if not ts_id:
             continue
-        per   = str(r.get("period","")).strip()
-        note  = str(r.get("notes",""))
-        ctx   = str(r.get("quote_excerpt",""))
-        sk    = str(r.get("snippet_or_key",""))
+        per   = cols["period"][i].strip()
+        note  = note_a[i]
+        ctx   = ctx_a[i]
+        note_hw = note_hw_a[i]
+        ctx_hw  = ctx_hw_a[i]
 
         # 年份推断
-        year = None
-        tmp = note + " " + ctx
-        m_year = re.search(r"(19\d{2}|20\d{2})年", _to_halfwidth(tmp))
-        if m_year: year = int(m_year.group(1))
+        year = int(year_a[i]) or None
         if not year and per in ["1931","1954"]:
             year = int(per)
 
         # 日期
-        dates1 = parse_dates_from_text(ctx, default_year=year)
-        dates2 = parse_dates_from_text(note, default_year=year)
+        dates1 = parse_dates_from_text(ctx_hw, default_year=year, already_halfwidth=True) \
+                 if _HAS_DATE_HINT.search(ctx_hw) else []
+        dates2 = parse_dates_from_text(note_hw, default_year=year, already_halfwidth=True) \
+                 if not dates1 and _HAS_DATE_HINT.search(note_hw) else []
         cand_dates = dates1 if dates1 else dates2
         if not cand_dates:
             extract_logs.append((idx, ts_id, "NO_DATE", "", "", note[:60], ctx[:120]))
             continue
 
         # 数量（kg）
-        qty = parse_quantities_from_text(ctx)
+        qty = parse_quantities_from_text(ctx_hw, already_halfwidth=True)
         val_default = DEFAULT_EVENT_VALUE if qty is None else float(qty)
 
         # —— 分类命名（地名规则优先 + P010/P020 + 关键词）
         tsu = ts_id.upper()
-        merged_txt = (ctx + " " + note)
-        merged_low = merged_txt.lower()
+        merged_low = merged_low_a[i]
 
-        # 方向关键词 + 编码
-        ship_kw = ["发运","起运","启运","发出","运出","装船","装车","开航","发往","发去","发至","起运于","出发"]
-        arr_kw  = ["到达","抵达","运到","运至","送达","收到","收讫","到库","入库","验收入库","收储","接收","交付"]
+        # 关键词类别（已逐列预计算）+ 方向编码
+        cats = cats_a[i]
 
         dir_from_code = None
-        code_field = (str(r.get("mapped_param_id","")) + " " + str(r.get("snippet_or_key","")) + " " + tsu).upper()
+        code_field = (cols["mapped_param_id"][i] + " " + cols["snippet_or_key"][i] + " " + tsu).upper()
         if "P010" in code_field: dir_from_code = "SHIP"
         if "P020" in code_field: dir_from_code = "ARR"
 
-        def has_any(keys): return any(k.lower() in merged_low for k in keys)
-
-        # 链路推断：优先地名规则；显式 ZP/PC/CV；层级启发；最后 UNK
-        def decide_link(ts_id, text):
-            for rx, lk in geo_rules:
-                if rx.search(text):
-                    return lk
-            u = (ts_id or "").upper()
-            if "ZP" in u: return "ZP"
-            if "PC" in u: return "PC"
-            if "CV" in u: return "CV"
-            uu = text.upper()
-            if "ZP" in uu: return "ZP"
-            if "PC" in uu: return "PC"
-            if "CV" in uu: return "CV"
-            tl = text
-            has_sheng = ("省" in tl)
-            has_zhuanqu = ("专区" in tl) or ("专署" in tl) or ("地区" in tl) or ("行政督察区" in tl)
-            has_xian = ("县" in tl) or ("市" in tl) or ("市辖区" in tl)
-            has_xiangcun = ("乡" in tl) or ("鎭" in tl) or ("镇" in tl) or ("村" in tl) or ("公社" in tl) or ("大队" in tl) or ("生产队" in tl)
-            if has_sheng and has_zhuanqu and not has_xian:
-                return "ZP"
-            if has_zhuanqu and has_xian and not has_xiangcun:
-                return "PC"
-            if has_xian and has_xiangcun:
-                return "CV"
-            return "UNK"
-
-        link = decide_link(ts_id, merged_txt)
-
-        media_kw= ["媒体","报刊","电台","广播","专电","通电","呈文","报告","批复","指示","指令","请求","请拨","请赈","致函","启事","公告"]
-        stock_kw= ["库存","仓","仓库","在库","在途","存粮","存料","转仓","出入库","清查","盘点"]
-        alloc_kw= ["拨付","拨款","划拨","下拨","经费","款项","募捐","募集","捐助","赈济款","赈款","拨交","拨给","拨至"]
-        vdist_kw= ["发放","分发","赈济","救济","救发","配给","配售","按户发放","按人发放","按口粮","按人口","下发","发至各村"]
+        link = decide_link(ts_id, merged_low)
 
         # 是否运输相关
-        is_linkish = ("LINK" in tsu) or ("运输" in merged_low) or ("运" in merged_low) or has_any(ship_kw+arr_kw) or (dir_from_code is not None)
+        is_linkish = ("LINK" in tsu) or ("TRANSPORT" in cats) or ("SHIP" in cats) or ("ARR" in cats) or (dir_from_code is not None)
 
+        cur_link = cur_dir = -1
         if is_linkish:
-            if dir_from_code == "SHIP" or has_any(ship_kw):
-                name = f"LINK_{link}_SHIP"
-            elif dir_from_code == "ARR" or has_any(arr_kw):
-                name = f"LINK_{link}_ARR"
+            cur_link = LINK_CODE[link]
+            if dir_from_code == "SHIP" or ("SHIP" in cats):
+                cur_dir = DIR_CODE["SHIP"]
+            elif dir_from_code == "ARR" or ("ARR" in cats):
+                cur_dir = DIR_CODE["ARR"]
             else:
-                name = f"LINK_{link}_UNK"
-        elif ("MEDIA" in tsu) or ("REQ" in tsu) or has_any(media_kw):
+                cur_dir = DIR_CODE["UNK"]
+            # —— 兜底分配（分别对 link / dir）
+            if FALLBACK_ENABLE:
+                if cur_link == LINK_CODE["UNK"]:
+                    cur_link = int(link_draws[i])
+                if cur_dir == DIR_CODE["UNK"]:
+                    cur_dir = int(dir_draws[i])
+            name = NAME_TABLE[(cur_link, cur_dir)]
+        elif ("MEDIA" in tsu) or ("REQ" in tsu) or ("MEDIA" in cats):
             name = "MEDIA_REQ"
-        elif ("STOCK" in tsu) or has_any(stock_kw):
+        elif ("STOCK" in tsu) or ("STOCK" in cats):
             name = "STOCKS"
-        elif ("BREACH" in tsu) or ("溃堤" in merged_low) or ("决口" in merged_low):
+        elif ("BREACH" in tsu) or ("BREACH" in cats):
             name = "BREACH"
-        elif ("ALLOC" in tsu) or has_any(alloc_kw):
+        elif ("ALLOC" in tsu) or ("ALLOC" in cats):
             name = "ALLOC"
-        elif ("V_DIST" in tsu) or ("VILLAGE" in tsu) or has_any(vdist_kw):
+        elif ("V_DIST" in tsu) or ("VILLAGE" in tsu) or ("VDIST" in cats):
             name = "V_DIST"
         else:
             name = "MISC"
 
-        # —— 从 name 拆出 link/dir（便于兜底分别处理）
-        cur_link = "UNK"
-        cur_dir  = "UNK"
-        if name.startswith("LINK_"):
-            parts = name.split("_")
-            if len(parts) >= 3:
-                cur_link = parts[1] if parts[1] in {"ZP","PC","CV","UNK"} else "UNK"
-                cur_dir  = parts[2] if parts[2] in {"SHIP","ARR","UNK"} else "UNK"
-
-        # —— 兜底分配（分别对 link / dir）
-        if FALLBACK_ENABLE and name.startswith("LINK_"):
-            if cur_link == "UNK":
-                cur_link = _choose_by_probs(FALLBACK_LINK_PROBS)
-            if cur_dir == "UNK":
-                cur_dir = _choose_by_probs(FALLBACK_DIR_PROBS)
-            name = f"LINK_{cur_link}_{cur_dir}"
-
         # —— 写入记录（考虑区间、端点分拆；BREACH 强制端点）
         use_uniform = (DATE_RANGE_MODE == "uniform") and (len(cand_dates) >= 2) and (name != "BREACH")
 
@@ -480,121 +736,131 @@ def build_series_from_evidence(sheets, freq="D", week_rule="W-MON"):
             days = max(1, (dB - dA).days + 1)
             per_day = val_default / days
 
-            if FALLBACK_ENABLE and FALLBACK_SPLIT_ENDPOINTS and name.startswith("LINK_") and days >= 2:
-                parts = name.split("_")
-                lk = parts[1] if len(parts)>=2 else "UNK"
-                # 最早端点→SHIP
-                rows_split.append({"ts_id": f"LINK_{lk}_SHIP", "date": pd.Timestamp(dA), "value": per_day})
-                # 中间天：维持当前方向（name）
-                cur = dA + pd.Timedelta(days=1)
-                while cur < dB:
-                    rows_split.append({"ts_id": name, "date": pd.Timestamp(cur), "value": per_day})
-                    cur = cur + pd.Timedelta(days=1)
-                # 最晚端点→ARR
-                rows_split.append({"ts_id": f"LINK_{lk}_ARR", "date": pd.Timestamp(dB), "value": per_day})
+            rng_idx = pd.date_range(dA, dB, freq="D").values
+            n = len(rng_idx)
+            if FALLBACK_ENABLE and FALLBACK_SPLIT_ENDPOINTS and cur_link >= 0 and days >= 2:
+                # 最早端点→SHIP；中间天维持当前方向（name）；最晚端点→ARR
+                ts_ids.append(NAME_TABLE[(cur_link, DIR_CODE["SHIP"])])
+                ts_ids.extend([name] * (n - 2))
+                ts_ids.append(NAME_TABLE[(cur_link, DIR_CODE["ARR"])])
+                link_codes.extend([cur_link] * n)
+                dir_codes.append(DIR_CODE["SHIP"])
+                dir_codes.extend([cur_dir] * (n - 2))
+                dir_codes.append(DIR_CODE["ARR"])
+                dates.extend(rng_idx)
+                values.extend([per_day] * n)
                 extract_logs.append((idx, ts_id, "RANGE_UNIFORM_SPLIT",
                                      f"{dA.isoformat()}~{dB.isoformat()}",
                                      "QTY" if qty is not None else "EVENT+1", note[:60], ctx[:120]))
             else:
-                cur = dA
-                while cur <= dB:
-                    rows_split.append({"ts_id": name, "date": pd.Timestamp(cur), "value": per_day})
-                    cur = cur + pd.Timedelta(days=1)
+                ts_ids.extend([name] * n)
+                link_codes.extend([cur_link] * n)
+                dir_codes.extend([cur_dir] * n)
+                dates.extend(rng_idx)
+                values.extend([per_day] * n)
                 extract_logs.append((idx, ts_id, "RANGE_UNIFORM",
                                      f"{dA.isoformat()}~{dB.isoformat()}",
                                      "QTY" if qty is not None else "EVENT+1", note[:60], ctx[:120]))
         else:
             ends = [d_first, d_last] if len(cand_dates_sorted) >= 2 else [d_first]
-            if FALLBACK_ENABLE and FALLBACK_SPLIT_ENDPOINTS and name.startswith("LINK_") and len(ends) == 2:
-                parts = name.split("_")
-                lk = parts[1] if len(parts)>=2 else "UNK"
-                rows_split.append({"ts_id": f"LINK_{lk}_SHIP", "date": pd.Timestamp(ends[0]), "value": val_default})
-                rows_split.append({"ts_id": f"LINK_{lk}_ARR",  "date": pd.Timestamp(ends[1]), "value": val_default})
+            if FALLBACK_ENABLE and FALLBACK_SPLIT_ENDPOINTS and cur_link >= 0 and len(ends) == 2:
+                ts_ids.extend([NAME_TABLE[(cur_link, DIR_CODE["SHIP"])], NAME_TABLE[(cur_link, DIR_CODE["ARR"])]])
+                link_codes.extend([cur_link, cur_link])
+                dir_codes.extend([DIR_CODE["SHIP"], DIR_CODE["ARR"]])
+                dates.extend([pd.Timestamp(ends[0]), pd.Timestamp(ends[1])])
+                values.extend([val_default, val_default])
                 extract_logs.append((idx, ts_id, "ENDPOINTS_SPLIT",
                                      ",".join([x.isoformat() for x in ends]),
                                      "QTY" if qty is not None else "EVENT+1", note[:60], ctx[:120]))
             else:
                 for d in ends:
-                    rows_split.append({"ts_id": name, "date": pd.Timestamp(d), "value": val_default})
+                    ts_ids.append(name); dates.append(pd.Timestamp(d)); values.append(val_default)
+                    link_codes.append(cur_link); dir_codes.append(cur_dir)
                 extract_logs.append((idx, ts_id, "ENDPOINTS" if len(ends)==2 else ("QTY" if qty is not None else "EVENT+1"),
                                      ",".join([x.isoformat() for x in ends]),
                                      "QTY" if qty is not None else "EVENT+1", note[:60], ctx[:120]))
 
-    # —— 汇总前的“终端后处理”：1) 二次分配 UNK；2) 按 τ 先验合成成对方向
-    if rows_split:
-        # 1) 二次分配 UNK：把 LINK_UNK_UNK / LINK_UNK_* / LINK_*_UNK 都分配到 ZP/PC/CV × SHIP/ARR
-        if FALLBACK_ENABLE and FALLBACK_REASSIGN_UNK:
-            for i, row in enumerate(rows_split):
-                ts = row["ts_id"]
-                if not isinstance(ts, str):
-                    continue
-                if not ts.startswith("LINK_"):
-                    continue
-                parts = ts.split("_")
-                # 规范化为 LINK_<link>_<dir>
-                cur_link = parts[1] if len(parts) >= 2 else "UNK"
-                cur_dir  = parts[2] if len(parts) >= 3 else "UNK"
-                if cur_link == "UNK":
-                    cur_link = _choose_by_probs(FALLBACK_LINK_PROBS)
-                if cur_dir == "UNK":
-                    cur_dir = _choose_by_probs(FALLBACK_DIR_PROBS)
-                rows_split[i]["ts_id"] = f"LINK_{cur_link}_{cur_dir}"
-
-        # 2) 若某链路只有一侧方向，则合成另一侧（按 τ 先验平移）
-        if SYNTHESIZE_PAIRED:
-            # 收集每条链路的日期与值
-            link_dir_to_items = {}  # (link, dir) -> list[(date, value)]
-            for row in rows_split:
-                ts = row["ts_id"]
-                if not ts.startswith("LINK_"):
-                    continue
-                parts = ts.split("_")
-                if len(parts) < 3: 
-                    continue
-                lk, dr = parts[1], parts[2]
-                if lk not in {"ZP","PC","CV"} or dr not in {"SHIP","ARR"}:
-                    continue
-                link_dir_to_items.setdefault((lk, dr), []).append((pd.Timestamp(row["date"]).normalize(), float(row["value"])))
-
-            # 对每个链路检查是否缺少一侧
-            for lk in ["ZP","PC","CV"]:
-                has_ship = (lk, "SHIP") in link_dir_to_items and len(link_dir_to_items[(lk,"SHIP")])>0
-                has_arr  = (lk, "ARR")  in link_dir_to_items and len(link_dir_to_items[(lk,"ARR")])>0
-                if has_ship and has_arr:
-                    continue  # 成对齐全
-
-                tau = TAU_PRIOR_PER_LINK.get(lk, 5)
-                if tau <= 0:
-                    tau = 5
-
-                if has_ship and not has_arr:
-                    # 用 SHIP 合成 ARR：向后平移 τ 天
-                    for d, v in link_dir_to_items[(lk, "SHIP")]:
-                        rows_split.append({"ts_id": f"LINK_{lk}_ARR",
-                                           "date": pd.Timestamp(d) + pd.Timedelta(days=tau),
-                                           "value": float(v) * PAIR_SCALE})
-                elif has_arr and not has_ship:
-                    # 用 ARR 合成 SHIP：向前平移 τ 天（不早于最小日期减去 365，以防越界太多）
-                    for d, v in link_dir_to_items[(lk, "ARR")]:
-                        rows_split.append({"ts_id": f"LINK_{lk}_SHIP",
-                                           "date": pd.Timestamp(d) - pd.Timedelta(days=tau),
-                                           "value": float(v) * PAIR_SCALE})
-
     # —— 汇总
-    if not rows_split:
+    if not ts_ids:
         series_table = {}
         log_df = pd.DataFrame(extract_logs, columns=["evidence_row","ts_id","mode","date_or_range","parsed","note_head","ctx_head"])
         series_extracted_split = pd.DataFrame(columns=["ts_id","date","value"])
         return series_table, log_df, series_extracted_split
 
-    df = pd.DataFrame(rows_split)
+    df = pd.DataFrame({"ts_id": ts_ids, "date": dates, "value": values})
+
+    # —— 汇总前的“终端后处理”：1) 二次分配 UNK；2) 按 τ 先验合成成对方向
+    # 直接使用循环内记录的 link/dir 编码列，无需再从 ts_id 拆分
+    lk = np.asarray(link_codes, dtype=np.int64)
+    dr = np.asarray(dir_codes, dtype=np.int64)
+    is_link = lk >= 0
+
+    # 1) 二次分配 UNK：把 LINK_UNK_UNK / LINK_UNK_* / LINK_*_UNK 都分配到 ZP/PC/CV × SHIP/ARR
+    if FALLBACK_ENABLE and FALLBACK_REASSIGN_UNK:
+        todo = np.flatnonzero(is_link & ((lk == LINK_CODE["UNK"]) | (dr == DIR_CODE["UNK"])))
+        if todo.size:
+            # 按 UNK 条数整批抽样
+            lk_draws = _choose_link(todo.size)
+            dr_draws = _choose_dir(todo.size)
+            lk[todo] = np.where(lk[todo] == LINK_CODE["UNK"], lk_draws, lk[todo])
+            dr[todo] = np.where(dr[todo] == DIR_CODE["UNK"], dr_draws, dr[todo])
+            df.loc[todo, "ts_id"] = [NAME_TABLE[(l, d)] for l, d in zip(lk[todo].tolist(), dr[todo].tolist())]
+
+    # 2) 若某链路只有一侧方向，则合成另一侧（按 τ 先验平移）
+    if SYNTHESIZE_PAIRED:
+        # 各链路 × {SHIP, ARR} 的记录条数（编码 ZP/PC/CV=0..2，SHIP/ARR=0..1）
+        paired = is_link & (lk < LINK_CODE["UNK"]) & (dr < DIR_CODE["UNK"])
+        counts = np.bincount(lk[paired] * 2 + dr[paired], minlength=6).reshape(3, 2)
+        synth = []
+        for link in ["ZP","PC","CV"]:
+            l = LINK_CODE[link]
+            has_ship = counts[l, DIR_CODE["SHIP"]] > 0
+            has_arr  = counts[l, DIR_CODE["ARR"]] > 0
+            if has_ship == has_arr:
+                continue  # 成对齐全或两侧皆无
+
+            tau = TAU_PRIOR_PER_LINK.get(link, 5)
+            if tau <= 0:
+                tau = 5
+
+            # 有 SHIP 缺 ARR：向后平移 τ 天；有 ARR 缺 SHIP：向前平移 τ 天
+            src, dst, shift = ("SHIP", "ARR", tau) if has_ship else ("ARR", "SHIP", -tau)
+            sub = df[paired & (lk == l) & (dr == DIR_CODE[src])]
+            synth.append(pd.DataFrame({
+                "ts_id": NAME_TABLE[(l, DIR_CODE[dst])],
+                "date": pd.to_datetime(sub["date"]).dt.normalize() + pd.Timedelta(days=shift),
+                "value": sub["value"].astype(float) * PAIR_SCALE,
+            }))
+        if synth:
+            df = pd.concat([df] + synth, ignore_index=True)
+
     agg = df.groupby(["ts_id","date"])["value"].sum().reset_index()
 
-    # 转为率定用字典
+    # 转为率定用字典：以数据最早日为原点的整数日偏移，(ts_id, 日) 二维 bincount 一次求和，
+    # 再按各序列自身首末日切片
+    day = pd.to_datetime(agg["date"]).dt.floor("D").to_numpy(dtype="datetime64[D]")
+    origin = day.min()
+    di = (day - origin).astype(np.int64)
+    codes, names = pd.factorize(agg["ts_id"], sort=True)
+    K, n_days = len(names), int(di.max()) + 1
+    grid = np.bincount(codes * n_days + di, weights=agg["value"].to_numpy(dtype=float),
+                       minlength=K * n_days).reshape(K, n_days)
+    first = np.full(K, n_days, dtype=np.int64); np.minimum.at(first, codes, di)
+    last = np.zeros(K, dtype=np.int64);          np.maximum.at(last, codes, di)
+    day_idx = pd.date_range(pd.Timestamp(origin), periods=n_days, freq="D")
+
     series_table = {}
-    for ts_name, grp in agg.groupby("ts_id"):
-        ser = resample_series(grp["date"].values, grp["value"].values, freq=freq, week_rule=week_rule)
-        series_table[ts_name] = ser
+    if freq == "D":
+        for c, ts_name in enumerate(names):
+            a, b = first[c], last[c] + 1
+            series_table[ts_name] = pd.Series(grid[c, a:b], index=day_idx[a:b])
+    else:
+        # 周模式：整表一次 resample；首末日落入的周桶即该序列的起止
+        wk = pd.DataFrame(grid.T, index=day_idx, columns=names).resample(week_rule).sum()
+        pos_a = wk.index.searchsorted(day_idx[first], side="left")
+        pos_b = wk.index.searchsorted(day_idx[last], side="left")
+        for ts_name, a, b in zip(names, pos_a, pos_b):
+            series_table[ts_name] = wk[ts_name].iloc[a:b+1].rename(None)
 
     log_df = pd.DataFrame(extract_logs, columns=["evidence_row","ts_id","mode","date_or_range","parsed","note_head","ctx_head"])
     series_extracted_split = agg.sort_values(["ts_id","date"]).reset_index(drop=True)
@@ -603,70 +869,141 @@ def build_series_from_evidence(sheets, freq="D", week_rule="W-MON"):
 # =========================
 # 率定模块
 # =========================
-def estimate_hazard(series_table, smooth_lambda=5.0):
-    """从 BREACH & MEDIA_REQ 构建 hazard 强度（两个观测通道）。"""
-    y_breach = None
-    for key in series_table:
-        if "BREACH" in key.upper():
-            y_breach = series_table[key]; break
-    y_media = None
+def classify_keys(series_table):
+    """一次遍历把序列名按用途分桶：breach / media / link（保持 series_table 原顺序）。"""
+    keys = {"breach": [], "media": [], "link": []}
     for key in series_table:
-        if ("MEDIA" in key.upper()) or ("REQ" in key.upper()):
-            y_media = series_table[key] if y_media is None else (y_media + series_table[key])
+        u = key.upper()
+        if "BREACH" in u:
+            keys["breach"].append(key)
+        if ("MEDIA" in u) or ("REQ" in u):
+            keys["media"].append(key)
+        if "LINK" in u:
+            keys["link"].append(key)
+    return keys
 
-    if y_breach is None and y_media is None:
+def align_series(series_table):
+    """
+    把 dict-of-Series 一次对齐为矩阵，供各估计函数按行切片，免去逐函数 union/reindex：
+      index：全部序列日期的并集（主索引）
+      values：(序列数, 主索引长) 矩阵，缺失处为 0
+      mask：同形布尔矩阵，标记各序列自身覆盖的日期（用于还原“参与序列的索引并集”）
+      row：序列名 → 行号
+    """
+    names = list(series_table)
+    index = pd.DatetimeIndex([])
+    for k in names:
+        index = index.union(series_table[k].index)
+    values = np.zeros((len(names), len(index)))
+    mask = np.zeros((len(names), len(index)), dtype=bool)
+    for i, k in enumerate(names):
+        pos = index.get_indexer(series_table[k].index)
+        values[i, pos] = series_table[k].fillna(0.0).to_numpy(dtype=float)
+        mask[i, pos] = True
+    return {"index": index, "values": values, "mask": mask, "row": {k: i for i, k in enumerate(names)}}
+
+def _aligned_sum(aligned, names):
+    """若干序列在主索引上逐日求和（缺失按 0），并返回覆盖日期的并集；names 为空时返回 (None, None)。"""
+    if not names:
+        return None, None
+    rows = [aligned["row"][k] for k in names]
+    return aligned["values"][rows].sum(axis=0), aligned["mask"][rows].any(axis=0)
+
+def estimate_hazard(series_table, smooth_lambda=5.0, keys=None, aligned=None):
+    """
+    从 BREACH & MEDIA_REQ 构建 hazard 强度（两个观测通道）。
+    keys / aligned 可由调用方预先算好（classify_keys / align_series）并在各估计函数间共用。
+    """
+    if keys is None:
+        keys = classify_keys(series_table)
+    if aligned is None:
+        aligned = align_series(series_table)
+    v_breach, m_breach = _aligned_sum(aligned, keys["breach"][:1])
+    v_media, m_media = _aligned_sum(aligned, keys["media"])
+
+    if v_breach is None and v_media is None:
         return None
 
-    idx = y_breach.index if y_breach is not None else y_media.index
-    y1 = y_breach.reindex(idx).fillna(0.0) if y_breach is not None else pd.Series(0.0, index=idx)
-    y2 = y_media.reindex(idx).fillna(0.0) if y_media is not None else pd.Series(0.0, index=idx)
-
+    # 以 BREACH 自身日期为准（无 BREACH 时用媒体序列的日期）
+    cols = m_breach if v_breach is not None else m_media
+    idx = aligned["index"][cols]
     T = len(idx)
-    x0 = np.r_[np.maximum(y1.values + y2.values, 1.0)*0.2, 0.0, 0.0]
-    lb = np.r_[np.zeros(T), -8.0, -8.0]
-    ub = np.r_[np.ones(T)*1e5, 8.0, 8.0]
-
-    def nll(z):
-        h = np.clip(z[:T], 1e-8, None)
-        a1 = math.exp(z[T+0]); a2 = math.exp(z[T+1])
-        ll1 = poisson_nll(y1.values, a1*h)
-        ll2 = poisson_nll(y2.values, a2*h)
-        dh = np.diff(h)
-        pen = smooth_lambda * np.sum(dh*dh)
-        return ll1 + ll2 + pen
-
-    res = minimize(nll, x0, method="L-BFGS-B", bounds=list(zip(lb, ub)))
+    y1v = np.ascontiguousarray(v_breach[cols]) if v_breach is not None else np.zeros(T)
+    y2v = np.ascontiguousarray(v_media[cols]) if v_media is not None else np.zeros(T)
+    # h 的初值经 softplus 反函数 ξ = h + log(1 - e^{-h}) 映射到无约束尺度
+    h0 = np.maximum(y1v + y2v, 1.0)*0.2
+    x0 = np.r_[h0 + np.log(-np.expm1(-h0)), 0.0, 0.0]
+    # 似然只识别乘积 α·h（平滑惩罚会把 h 压向 0、α 顶到边界），故把有数据通道的 log α 固定为 0 定标：
+    # 有 BREACH 时固定 α_breach（h 以 BREACH 日均事件数计），否则固定 α_media；ξ 无界，另一 log α 设边界
+    anchor = 0 if v_breach is not None else 1
+    lb = np.r_[np.full(T, -np.inf), -8.0, -8.0]; ub = np.r_[np.full(T, np.inf), 8.0, 8.0]
+    lb[T + anchor] = ub[T + anchor] = 0.0
+    bounds = Bounds(lb, ub)
+
+    args = (y1v + y2v, float(y1v.sum()), float(y2v.sum()), float(smooth_lambda))
+    res = minimize(hazard_nll, x0, args=args, jac=True, method="L-BFGS-B", bounds=bounds)
     z = res.x
-    h = np.clip(z[:T], 0.0, None)
+    h = np.logaddexp(0.0, z[:T])
     return pd.DataFrame({
         "date": idx.date, "hazard_rate_est": h,
         "alpha_breach": math.exp(z[T+0]), "alpha_media": math.exp(z[T+1]),
         "objective": res.fun, "success": res.success
     })
 
+def _lagged_corr(s, a, max_lag):
+    """
+    s 右移 L 天（前补 0）后与 a 的 Pearson 相关，L = 0..max_lag 一次算出：
+    互相关项用 FFT 卷积，移位序列的均值/方差由前缀和给出（均先去均值以减小抵消误差）。
+    方差≈0 或 L ≥ T 的滞后记为 NaN。
+    """
+    T = len(s)
+    out = np.full(max_lag + 1, np.nan)
+    n = min(max_lag, T - 1) + 1
+    if n <= 0:
+        return out
+    mu = s.mean()
+    sc = s - mu
+    ac = a - a.mean()
+    L = np.arange(n)
+    # 平移后序列 x_L = [−mu]*L + sc[:T−L]（整体减 mu 不改变相关系数）
+    cross = fftconvolve(ac, sc[::-1], mode="full")[T-1:T-1+n]
+    num = cross - mu * np.r_[0.0, np.cumsum(ac)][L]
+    c1 = np.r_[0.0, np.cumsum(sc)][T - L] - mu * L
+    c2 = np.r_[0.0, np.cumsum(sc * sc)][T - L] + mu * mu * L
+    var_x = c2 / T - (c1 / T) ** 2
+    sd_x = np.sqrt(np.clip(var_x, 0.0, None))
+    sd_a = np.sqrt(np.mean(ac * ac))
+    # 前缀和方差有 ~eps·E[x²] 的抵消误差：相对阈值把“窗口内已为常数”的滞后判为无效
+    ok = (sd_x > 1e-12) & (var_x > 1e-10 * c2 / T) & (sd_a > 1e-12)
+    out[:n][ok] = num[ok] / (T * sd_x[ok] * sd_a)
+    return out
+
+def _filled(x):
+    """Series 或数组 → float 数组，NaN 置 0（无 NaN 时不复制）。"""
+    v = np.asarray(x, dtype=float)
+    return np.where(np.isnan(v), 0.0, v) if np.isnan(v).any() else v
+
 def estimate_tau_via_xcorr(ship_ser, arr_ser, max_lag=30):
-    s = ship_ser.fillna(0.0).values
-    a = arr_ser.fillna(0.0).values
-    best_lag = 0; best_corr = -1e9
-    for L in range(0, max_lag+1):
-        s_shift = np.r_[np.zeros(L), s[:-L]] if L>0 else s
-        corr = -1e9
-        if np.std(s_shift)>1e-12 and np.std(a)>1e-12:
-            corr = np.corrcoef(s_shift, a)[0,1]
-        if corr > best_corr:
-            best_corr, best_lag = corr, L
-    return best_lag, best_corr
+    s = _filled(ship_ser)
+    a = _filled(arr_ser)
+    corrs = _lagged_corr(s, a, max_lag)
+    if np.isnan(corrs).all():
+        return 0, -1e9
+    # 稀疏序列常出现数值上相等的多个极大值：取其中最小的滞后
+    best = np.nanmax(corrs)
+    best_lag = int(np.flatnonzero(corrs >= best - 1e-12 * max(1.0, abs(best)))[0])
+    return best_lag, float(corrs[best_lag])
 
 def refine_tau_mle(ship_ser, arr_ser, init_tau=5):
     """
-    在互相关初值附近，用 Poisson 似然细化 tau：
+    在互相关初值 init_tau 附近（±TAU_REFINE_HALFWIDTH 天，裁剪到 [0.1, 60]）用 Poisson 似然细化 tau：
       arr_t ~ Poisson( sum_k w_k * ship_{t-k} ), w 为中心在 tau 的离散高斯核
     —— 修复：
       1) k 上限裁剪到 T-1，避免空切片/负切片
       2) 极短序列或全零时回退为 xcorr lag
     """
-    s = ship_ser.fillna(0.0).values.astype(float)
-    a = arr_ser.fillna(0.0).values.astype(float)
+    s = _filled(ship_ser)
+    a = _filled(arr_ser)
     T = len(s)
 
     # 极短或全零直接回退
@@ -684,43 +1021,65 @@ def refine_tau_mle(ship_ser, arr_ser, init_tau=5):
         w = np.exp(-0.5*((ks - tau)/width)**2)
         w /= (w.sum() + 1e-12)
 
-        mu = np.zeros(T)
-        for k, wk in enumerate(w):
-            L = T - k
-            if L <= 0:
-                break
-            mu[k:] += wk * s[:L]
-        mu = np.clip(mu, 1e-8, None)
+        # mu[t] = Σ_k w_k·s[t−k]：因果卷积截取前 T 项
+        mu = np.convolve(s, w)[:T]
+        np.clip(mu, 1e-8, None, out=mu)
         return poisson_nll(a, mu)
 
     try:
-        res = minimize(nll, x0=np.array([float(init_tau)]), bounds=[(0.1, 60.0)], method="L-BFGS-B")
-        return float(res.x[0]), res.fun, res.success
+        # τ 为一维有界标量：Brent 有界搜索。高斯核宽度随 τ 增大，NLL 多峰，
+        # 故只在互相关初值附近 ±TAU_REFINE_HALFWIDTH 天内搜索，并与初值点比较取优
+        t0 = min(60.0, max(0.1, float(init_tau)))
+        lo = max(0.1, t0 - TAU_REFINE_HALFWIDTH); hi = min(60.0, t0 + TAU_REFINE_HALFWIDTH)
+        res = minimize_scalar(lambda t: nll((t,)), bounds=(lo, hi), method="bounded", options={"xatol": 1e-3})
+        f0 = nll((t0,))
+        if not (res.fun <= f0):
+            return t0, float(f0), bool(res.success)
+        return float(res.x), float(res.fun), bool(res.success)
     except Exception:
         # 再次兜底：直接返回互相关初值
         return float(max(0, int(round(init_tau)))), 0.0, False
 
-def estimate_taus(series_table):
-    out = []
-    for link in ["ZP","PC","CV"]:
-        ship_id = f"LINK_{link}_SHIP"
-        arr_id  = f"LINK_{link}_ARR"
-        if (ship_id in series_table) and (arr_id in series_table):
-            s = series_table[ship_id]; a = series_table[arr_id]
-            idx = s.index.union(a.index)
-            s = s.reindex(idx).fillna(0.0); a = a.reindex(idx).fillna(0.0)
-            lag0, corr0 = estimate_tau_via_xcorr(s, a, max_lag=30)
-            tau_hat, obj, ok = refine_tau_mle(s, a, init_tau=lag0)
-            out.append({"param_id": f"tau_{link}", "initial_cc_lag": lag0,
-                        "tau_hat": tau_hat, "cc": corr0, "objective": obj, "success": ok})
-    return pd.DataFrame(out)
+def _fit_link_tau(aligned, link):
+    """单条链路的 tau：互相关初值 + Poisson 细化；缺 SHIP/ARR 任一序列时返回 None。"""
+    ship_id = f"LINK_{link}_SHIP"
+    arr_id  = f"LINK_{link}_ARR"
+    row = aligned["row"]
+    if (ship_id not in row) or (arr_id not in row):
+        return None
+    # 两序列日期并集上的切片（主索引已排序，等价于 union + reindex + fillna）
+    i, j = row[ship_id], row[arr_id]
+    cols = aligned["mask"][i] | aligned["mask"][j]
+    s = aligned["values"][i, cols]; a = aligned["values"][j, cols]
+    lag0, corr0 = estimate_tau_via_xcorr(s, a, max_lag=30)
+    tau_hat, obj, ok = refine_tau_mle(s, a, init_tau=lag0)
+    return {"param_id": f"tau_{link}", "initial_cc_lag": lag0,
+            "tau_hat": tau_hat, "cc": corr0, "objective": obj, "success": ok}
+
+def estimate_taus(series_table, aligned=None):
+    if aligned is None:
+        aligned = align_series(series_table)
+    # 三条链路互相独立：线程池并行拟合（卷积/FFT 在 numpy/scipy 内释放 GIL），map 保持 ZP/PC/CV 顺序
+    links = ["ZP","PC","CV"]
+    with ThreadPoolExecutor(max_workers=len(links)) as ex:
+        rows = list(ex.map(lambda link: _fit_link_tau(aligned, link), links))
+    return pd.DataFrame([r for r in rows if r is not None])
 
 def estimate_thetas_rate(series_table):
     """
     θ_Z/P/C 与 rate_dist 的稳健粗估（95%分位）
     """
     out = []
-    def q95(ser): return float(np.quantile(ser.fillna(0.0).values, 0.95))
+    def q95(ser):
+        # 与 np.quantile(linear) 同值：只对两个相邻秩做 partition 选择；无 NaN 时不复制
+        v = ser.values
+        if np.isnan(v).any():
+            v = np.where(np.isnan(v), 0.0, v)
+        pos = 0.95 * (v.size - 1)
+        lo = int(pos); hi = min(lo + 1, v.size - 1); t = pos - lo
+        p = np.partition(v, (lo, hi))
+        a, b = p[lo], p[hi]
+        return float(a + (b - a) * t if t < 0.5 else b - (b - a) * (1.0 - t))
     if "V_DIST" in series_table:
         out.append({"param_id":"rate_dist", "estimate": q95(series_table["V_DIST"]), "method":"q95"})
     for lvl, link in [("Z","ZP"), ("P","PC"), ("C","CV")]:
@@ -729,56 +1088,53 @@ def estimate_thetas_rate(series_table):
             out.append({"param_id": f"theta_{lvl}", "estimate": q95(series_table[key]), "method":"q95"})
     return pd.DataFrame(out)
 
-def estimate_media_params(series_table):
+def estimate_media_params(series_table, keys=None, aligned=None):
     """
     媒体/申诉对调拨/到达的加速参数粗估：exp-kernel(media) 回归到 ALLOC（或 LINK 总量）。
+    keys / aligned 同 estimate_hazard。
     """
-    media = None
-    for k, ser in series_table.items():
-        u = k.upper()
-        if ("MEDIA" in u) or ("REQ" in u):
-            media = ser if media is None else (media + ser)
-    if media is None:
+    if keys is None:
+        keys = classify_keys(series_table)
+    if aligned is None:
+        aligned = align_series(series_table)
+    v_media, m_media = _aligned_sum(aligned, keys["media"])
+    if v_media is None:
         return pd.DataFrame([{"param_id":"k_news","estimate":0.0,"note":"no media series"},
                              {"param_id":"mu_media","estimate":0.0,"note":"no media series"}])
 
-    if "ALLOC" in series_table:
-        resp = series_table["ALLOC"]
-    else:
-        resp = None
-        for k, ser in series_table.items():
-            if "LINK" in k.upper():
-                resp = ser if resp is None else (resp + ser)
-    if resp is None:
+    v_resp, m_resp = _aligned_sum(aligned, ["ALLOC"] if "ALLOC" in series_table else keys["link"])
+    if v_resp is None:
         return pd.DataFrame([{"param_id":"k_news","estimate":0.0,"note":"no response series"},
                              {"param_id":"mu_media","estimate":0.0,"note":"no response series"}])
 
-    idx = media.index.union(resp.index)
-    m = media.reindex(idx).fillna(0.0).values
-    y = resp.reindex(idx).fillna(0.0).values
-
-    def fit(mu):
-        mu = max(1e-4, float(mu))
-        T = len(m)
-        g = np.zeros(T)
-        decay = np.exp(-mu*np.arange(T))
-        for t in range(T):
-            k = np.arange(t+1)
-            g[t] = (m[t-k] * decay[:t+1]).sum()
-        X = np.vstack([np.ones(T), g]).T
-        beta, _, _, _ = np.linalg.lstsq(X, y, rcond=None)
-        k_news = float(beta[1]); c0 = float(beta[0])
-        yhat = X @ beta
-        rmse = np.sqrt(np.mean((y - yhat)**2))
-        return rmse, k_news, mu, c0
-
-    grid = np.linspace(0.02, 0.5, 20)
-    best = None
-    for mu in grid:
-        rmse, k_news, mu_v, c0 = fit(mu)
-        if best is None or rmse < best[0]:
-            best = (rmse, k_news, mu_v, c0)
-    rmse, k_news, mu_media, c0 = best
+    cols = m_media | m_resp
+    m = v_media[cols]
+    y = v_resp[cols]
+
+    # 各 μ 的指数核响应 g[t] = Σ_{k≤t} m[t−k]·e^{−μk}，即单极点递推 g[t] = m[t] + e^{−μ}·g[t−1]
+    # （递推为 O(T)，无需构造衰减核或做 FFT；极点 e^{−μ} 一次算出，结果直接写入预分配的 G）
+    grid = np.maximum(np.linspace(0.02, 0.5, 20), 1e-4)
+    rhos = np.exp(-grid)
+    G = np.empty((grid.size, m.size))
+    for i, rho in enumerate(rhos):
+        G[i] = lfilter([1.0], [1.0, -rho], m)
+
+    # y = c0 + k_news·g 的一元 OLS 对全部 μ 批量闭式求解（中心化形式，免去逐 μ lstsq）
+    g_bar = G.mean(axis=1)
+    Gc = G - g_bar[:, None]
+    yc = y - y.mean()
+    sxx = np.einsum("ij,ij->i", Gc, Gc)
+    sxy = Gc @ yc
+    # g 为常数（如媒体序列全 0）时斜率不可辨识：取 k=0、截距为均值
+    ok = sxx > 1e-12 * np.maximum(np.einsum("ij,ij->i", G, G), 1e-300)
+    k_all = np.where(ok, sxy / np.where(ok, sxx, 1.0), 0.0)
+    c0_all = y.mean() - k_all * g_bar
+    # 残差平方和 Σ(yc − k·gc)² = Σyc² − 2k·sxy + k²·sxx，不再构造 (20, T) 残差矩阵
+    sse = np.maximum(yc @ yc - 2.0 * k_all * sxy + k_all * k_all * sxx, 0.0)
+    rmse_all = np.sqrt(sse / y.size)
+
+    b = int(np.argmin(rmse_all))
+    rmse, k_news, mu_media, c0 = float(rmse_all[b]), float(k_all[b]), float(grid[b]), float(c0_all[b])
     return pd.DataFrame([
         {"param_id":"k_news","estimate":k_news,"note":f"rmse={rmse:.4f}, intercept={c0:.2f}"},
         {"param_id":"mu_media","estimate":mu_media,"note":"gridsearch 0.02~0.5"},
@@ -796,11 +1152,13 @@ def main():
         sheets, freq=FREQ, week_rule=WEEK_RULE
     )
 
-    # 率定
-    hazard_df = estimate_hazard(series_table, smooth_lambda=SMOOTH_LAMBDA_HAZARD)
-    tau_df    = estimate_taus(series_table)
+    # 率定（序列分桶与矩阵对齐只做一次，hazard / tau / media 共用）
+    keys      = classify_keys(series_table)
+    aligned   = align_series(series_table)
+    hazard_df = estimate_hazard(series_table, smooth_lambda=SMOOTH_LAMBDA_HAZARD, keys=keys, aligned=aligned)
+    tau_df    = estimate_taus(series_table, aligned=aligned)
     thetas_df = estimate_thetas_rate(series_table)
-    media_df  = estimate_media_params(series_table)
+    media_df  = estimate_media_params(series_table, keys=keys, aligned=aligned)
 
     # 汇总参数
     results = []
@@ -808,8 +1166,11 @@ def main():
         results.append({"param_id":"P040(hazard_rate)", "estimate":"timeseries", "note":"see HAZARD_SERIES"})
         results.append({"param_id":"hazard_mean", "estimate": float(np.mean(hazard_df["hazard_rate_est"])), "note":"mean of hazard series"})
         results.append({"param_id":"hazard_peak", "estimate": float(np.max(hazard_df["hazard_rate_est"])), "note":"peak of hazard series"})
-        results.append({"param_id":"alpha_breach", "estimate": float(hazard_df["alpha_breach"].iloc[0]), "note":"scale"})
-        results.append({"param_id":"alpha_media", "estimate": float(hazard_df["alpha_media"].iloc[0]), "note":"scale"})
+        # 有 BREACH 序列时 α_breach 为定标锚（固定为 1），否则 α_media 为锚
+        anchor = "alpha_breach" if keys["breach"] else "alpha_media"
+        for pid in ("alpha_breach", "alpha_media"):
+            note = "fixed=1, scale anchor" if pid == anchor else "scale"
+            results.append({"param_id": pid, "estimate": float(hazard_df[pid].iloc[0]), "note": note})
     if tau_df is not None and not tau_df.empty:
         for _, r in tau_df.iterrows():
             results.append({"param_id": r["param_id"], "estimate": float(r["tau_hat"]), "note": f"xcorr={r['initial_cc_lag']}, cc={r['cc']:.3f}"})
@@ -822,16 +1183,13 @@ def main():
     calib_df = pd.DataFrame(results)
 
     # 导出聚合后的时序
-    ser_rows = []
-    for ts_id, ser in series_table.items():
-        for dt, val in ser.items():
-            ser_rows.append({"ts_id":ts_id, "date":dt.date(), "value":float(val)})
-    series_extracted = pd.DataFrame(ser_rows)
-
-    # 写回
-    with pd.ExcelWriter(WB_NAME, engine="xlsxwriter", mode="w") as writer:
-        for name, df in sheets.items():
-            df.to_excel(writer, index=False, sheet_name=name)
+    frames = [pd.DataFrame({"ts_id": ts_id, "date": ser.index.date, "value": ser.values.astype(float)})
+              for ts_id, ser in series_table.items()]
+    series_extracted = (pd.concat(frames, ignore_index=True) if frames
+                        else pd.DataFrame(columns=["ts_id","date","value"]))
+
+    # 写回：追加模式只替换生成的几张表，其余工作表原样保留、不再重新序列化
+    with pd.ExcelWriter(WB_NAME, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
         calib_df.to_excel(writer, index=False, sheet_name="CALIB_RESULTS")
         series_extracted.to_excel(writer, index=False, sheet_name="SERIES_EXTRACTED")
         series_extracted_split.to_excel(writer, index=False, sheet_name="SERIES_EXTRACTED_SPLIT")
@@ -3,17 +3,35 @@
 
 import os
 import argparse
+import functools
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+# 滞后相关与率定脚本共用同一实现（calibrate_all_params 导入时只做定义，不读写工作簿）
+from calibrate_all_params import _lagged_corr
+
+# --- 日期列 → 日粒度 Timestamp；已是 datetime 的列（Excel 读入的常态）跳过字符串解析
+def _to_day(col):
+    if not pd.api.types.is_datetime64_any_dtype(col):
+        col = pd.to_datetime(col, cache=True)
+    return col.dt.normalize()
+
+# --- 按 (路径, 表名) 缓存读入结果，date 列已转为日粒度；多张图共用同一份
+@functools.lru_cache(maxsize=4)
+def _load_sheet(path, sheet_name):
+    df = pd.read_excel(path, sheet_name=sheet_name)
+    if "date" in df.columns:
+        df["date"] = _to_day(df["date"])
+    return df
+
 # --- 兼容：wb 可为路径或 dict(sheet_name->DataFrame)
 def _read_sheet(wb, sheet_name):
     if isinstance(wb, dict):
         if sheet_name not in wb:
             raise KeyError(f"sheet '{sheet_name}' not in workbook dict")
         return wb[sheet_name].copy()
-    return pd.read_excel(wb, sheet_name=sheet_name)
+    return _load_sheet(wb, sheet_name).copy()
 
 def _ensure_outdir(outdir):
     os.makedirs(outdir, exist_ok=True)
@@ -22,7 +40,7 @@ def _daily(series_df, sid):
     g = series_df[series_df["ts_id"] == sid].copy()
     if g.empty:
         return pd.Series(dtype=float)
-    g["date"] = pd.to_datetime(g["date"]).dt.normalize()
+    g["date"] = _to_day(g["date"])
     return g.groupby("date")["value"].sum().sort_index()
 
 def _year_slice(s: pd.Series, year: int):
@@ -40,7 +58,7 @@ def plot_hazard_trajectory(wb, outdir, year=None):
         if not need.issubset(hz.columns):
             raise KeyError("HAZARD_SERIES missing columns")
         hz = hz.copy()
-        hz["date"] = pd.to_datetime(hz["date"]).dt.normalize()
+        hz["date"] = _to_day(hz["date"])
         ser = pd.Series(hz["hazard_rate_est"].values, index=hz["date"])
     except Exception:
         sed = _read_sheet(wb, "SERIES_EXTRACTED_SPLIT")
@@ -91,7 +109,7 @@ def plot_ship_arrive_pair(wb, outdir, series_sheet="SERIES_EXTRACTED_SPLIT", lin
         print(f"[WARN] No ship/arr series found for link={link}")
         return
 
-    g["date"] = pd.to_datetime(g["date"]).dt.normalize()
+    g["date"] = _to_day(g["date"])
     ship = g[g["ts_id"]==sid].groupby("date")["value"].sum().sort_index()
     arr  = g[g["ts_id"]==aid].groupby("date")["value"].sum().sort_index()
 
@@ -108,17 +126,12 @@ def plot_ship_arrive_pair(wb, outdir, series_sheet="SERIES_EXTRACTED_SPLIT", lin
     a = arr.reindex(idx).fillna(0.0)
 
     def xcorr_best_lag(sv, av, max_lag=30):
-        best_lag, best_cc = 0, -1e9
         max_lag = min(max_lag, max(0, len(sv)-1))
-        for L in range(0, max_lag+1):
-            s_shift = np.r_[np.zeros(L), sv[:-L]] if L>0 else sv
-            if np.std(s_shift) < 1e-12 or np.std(av) < 1e-12:
-                cc = -1e-9
-            else:
-                cc = np.corrcoef(s_shift, av)[0,1]
-            if cc > best_cc:
-                best_cc, best_lag = cc, L
-        return best_lag, best_cc
+        cc = _lagged_corr(np.asarray(sv, dtype=float), np.asarray(av, dtype=float), max_lag)
+        cc = np.where(np.isnan(cc), -1e-9, cc)   # 无效滞后记 -1e-9（与逐滞后版本一致）
+        best = cc.max()
+        best_lag = int(np.flatnonzero(cc >= best - 1e-12 * max(1.0, abs(best)))[0])
+        return best_lag, float(cc[best_lag])
 
     lag, cc = xcorr_best_lag(s.values, a.values, max_lag=max_lag)
     lag = int(max(0, min(lag, max(0, len(s)-1))))
@@ -151,7 +164,7 @@ def plot_coverage_top(wb, outdir, series_sheet="SERIES_EXTRACTED_SPLIT", topn=12
         return
 
     df = df.copy()
-    df["date"] = pd.to_datetime(df["date"]).dt.normalize()
+    df["date"] = _to_day(df["date"])
     if year is not None:
         df = df[df["date"].dt.year == year]
 
@@ -189,6 +202,10 @@ def main():
 
     try:
         wb = pd.read_excel(args.wb, sheet_name=None)
+        # 日期只解析一次；各图内的 _to_day 见到 datetime 列即跳过解析
+        for name in (args.series_sheet, "HAZARD_SERIES"):
+            if name in wb and "date" in wb[name].columns:
+                wb[name]["date"] = _to_day(wb[name]["date"])
     except Exception:
         wb = args.wb
 
@@ -1,6 +1,7 @@
 # sd_relief_manual.py
 # 4-layer (Z→P→C→V) flood-relief model with material + information flows
-# Pure-Python Euler simulator (dt=1 day) so it runs on any setup.
+# Euler simulator (dt=1 day); the step loop is JIT-compiled with numba when
+# available and runs as plain Python otherwise, so it still runs on any setup.
 # Outputs: relief_results.png, four_layer_schema.png
 
 from pathlib import Path
@@ -8,15 +9,44 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+try:  # numba is optional: without it the core loop runs as plain Python
+    from numba import njit, prange
+except ImportError:
+    prange = range
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
 OUT_DIR = Path(".")
 OUT_DIR.mkdir(exist_ok=True, parents=True)
 
 # ----------------------------
 # Common model/equations
 # ----------------------------
-def simulate(params, t_end=90, dt=1.0):
-    T = int(t_end/dt) + 1
-    time = np.arange(0, T)*dt
+# Parameter order of the flat vector passed to the compiled core
+PARAM_KEYS = (
+    "alpha_collect", "phi_admin", "price_food",
+    "theta_Z", "theta_P", "theta_C",
+    "tau_ZP", "tau_PC", "tau_CV",
+    "rate_dist", "hazard_rate",
+    "k_news", "mu_media", "k_req", "mu_app",
+)
+
+# Output channels, one column each in the (T, 20) array returned by the core
+CHANNELS = (
+    "Funds_Z", "Goods_Z", "Goods_P", "Goods_C", "Goods_V",
+    "InTransit_ZP", "InTransit_PC", "InTransit_CV",
+    "Need_V", "Give_V",
+    "Send_ZP", "Send_PC", "Send_CV",
+    "Arrive_P", "Arrive_C", "Arrive_V",
+    "Media_M", "Appeal_A", "prior_weight",
+    "News_in",
+)
+
+@njit(cache=True)
+def _simulate_core(p, T, dt):
+    out = np.empty((T, 20))
 
     # Stocks (initials)
     Funds_Z   = 0.0
@@ -32,31 +62,28 @@ def simulate(params, t_end=90, dt=1.0):
     Media_M   = 0.0
     Appeal_A  = 0.0
 
-    # Parameters
-    alpha_collect = params["alpha_collect"]
-    phi_admin     = params["phi_admin"]
-    price_food    = params["price_food"]
-
-    theta_Z = params["theta_Z"]
-    theta_P = params["theta_P"]
-    theta_C = params["theta_C"]
+    # Parameters (order as in PARAM_KEYS)
+    alpha_collect = p[0]
+    phi_admin     = p[1]
+    price_food    = p[2]
 
-    tau_ZP  = params["tau_ZP"]
-    tau_PC  = params["tau_PC"]
-    tau_CV  = params["tau_CV"]
+    theta_Z = p[3]
+    theta_P = p[4]
+    theta_C = p[5]
 
-    rate_dist   = params["rate_dist"]
-    hazard_rate = params["hazard_rate"]
+    tau_ZP  = p[6]
+    tau_PC  = p[7]
+    tau_CV  = p[8]
 
-    k_news   = params["k_news"]
-    mu_media = params["mu_media"]
-    k_req    = params["k_req"]
-    mu_app   = params["mu_app"]
+    rate_dist   = p[9]
+    hazard_rate = p[10]
 
-    # Logs
-    rows = []
+    k_news   = p[11]
+    mu_media = p[12]
+    k_req    = p[13]
+    mu_app   = p[14]
 
-    for t in time:
+    for i in range(T):
         # --- Information flows ---
         # News pulse grows with hazard + remaining need (scaled)
         News_in     = k_news * (hazard_rate + max(0.0, Need_V/1000.0))
@@ -112,21 +139,56 @@ def simulate(params, t_end=90, dt=1.0):
 
         Need_V  += (hazard_rate - Give_V)*dt
 
-        rows.append(dict(
-            Time=t,
-            Funds_Z=Funds_Z, Goods_Z=Goods_Z, Goods_P=Goods_P, Goods_C=Goods_C, Goods_V=Goods_V,
-            InTransit_ZP=InTr_ZP, InTransit_PC=InTr_PC, InTransit_CV=InTr_CV,
-            Need_V=Need_V, Give_V=Give_V,
-            Send_ZP=Send_ZP, Send_PC=Send_PC, Send_CV=Send_CV,
-            Arrive_P=Arrive_P, Arrive_C=Arrive_C, Arrive_V=Arrive_V,
-            Media_M=Media_M, Appeal_A=Appeal_A, prior_weight=prior_weight,
-            News_in=News_in
-        ))
-
-    df = pd.DataFrame(rows)
+        # Log (column order as in CHANNELS)
+        out[i, 0]  = Funds_Z;  out[i, 1]  = Goods_Z;  out[i, 2]  = Goods_P
+        out[i, 3]  = Goods_C;  out[i, 4]  = Goods_V
+        out[i, 5]  = InTr_ZP;  out[i, 6]  = InTr_PC;  out[i, 7]  = InTr_CV
+        out[i, 8]  = Need_V;   out[i, 9]  = Give_V
+        out[i, 10] = Send_ZP;  out[i, 11] = Send_PC;  out[i, 12] = Send_CV
+        out[i, 13] = Arrive_P; out[i, 14] = Arrive_C; out[i, 15] = Arrive_V
+        out[i, 16] = Media_M;  out[i, 17] = Appeal_A; out[i, 18] = prior_weight
+        out[i, 19] = News_in
+
+    return out
+
+def simulate(params, t_end=90, dt=1.0):
+    T = int(t_end/dt) + 1
+    p = np.array([params[k] for k in PARAM_KEYS], dtype=float)
+    out = _simulate_core(p, T, float(dt))
+
+    df = pd.DataFrame(out, columns=list(CHANNELS))
+    df.insert(0, "Time", np.arange(0, T)*dt)
     df["cum_give"] = df["Give_V"].cumsum()
     return df
 
+@njit(cache=True, parallel=True)
+def _simulate_batch_core(P, T, dt):
+    S = P.shape[0]
+    out = np.empty((S, T, 20))
+    for s in prange(S):
+        out[s] = _simulate_core(P[s], T, dt)
+    return out
+
+def simulate_batch(params_batch, t_end=90, dt=1.0, scenarios=None):
+    """Run S scenarios in one call.
+
+    params_batch maps every key of PARAM_KEYS to a length-S array (scalars are
+    broadcast). Returns the long-form frame of simulate() for all scenarios,
+    stacked in order, with a "scenario" column (labels from `scenarios`,
+    default 0..S-1).
+    """
+    T = int(t_end/dt) + 1
+    cols = [np.atleast_1d(np.asarray(params_batch[k], dtype=float)) for k in PARAM_KEYS]
+    S = max(len(c) for c in cols)
+    P = np.ascontiguousarray(np.stack([np.broadcast_to(c, (S,)) for c in cols], axis=1))
+    out = _simulate_batch_core(P, T, float(dt))
+
+    df = pd.DataFrame(out.reshape(S*T, 20), columns=list(CHANNELS))
+    df.insert(0, "Time", np.tile(np.arange(0, T)*dt, S))
+    df["cum_give"] = np.cumsum(out[:, :, 9], axis=1).ravel()
+    df["scenario"] = np.repeat(list(range(S)) if scenarios is None else list(scenarios), T)
+    return df
+
 # ----------------------------
 # Scenarios
 # ----------------------------
@@ -152,11 +214,9 @@ SC1954 = BASE | dict(
     mu_media=0.12, k_news=0.60
 )
 
-df31 = simulate(SC1931)
-df54 = simulate(SC1954)
-df31["scenario"] = "1931"
-df54["scenario"] = "1954"
-df = pd.concat([df31, df54], ignore_index=True)
+SCENARIOS = {"1931": SC1931, "1954": SC1954}
+df = simulate_batch({k: [sc[k] for sc in SCENARIOS.values()] for k in PARAM_KEYS},
+                    scenarios=list(SCENARIOS))
 
 # ----------------------------
 # Plots